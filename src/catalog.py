@@ -0,0 +1,93 @@
+import hashlib
+from datetime import date
+from typing import Iterable
+
+import polars as pl
+import src.parsing as parsing
+import src.utils as utils
+
+catalog_schema = {
+    "tournament": pl.String,
+    "CL": pl.String,
+    "gor_weight": pl.Float64,
+    "date": pl.Date,
+    "HA": pl.String,
+    "KM": pl.String,
+    "PC": pl.String,
+    "players": pl.Int32,
+    "rounds": pl.Int32,
+    "content_hash": pl.String,
+}
+
+
+def content_hash(gotha_string: str) -> str:
+    return hashlib.blake2b(gotha_string.encode(), digest_size=16).hexdigest()
+
+
+def _catalog_row(tournament_id: str, gotha_string: str, digest: str) -> dict:
+    header = parsing.tournament_header(gotha_string)
+    players, rounds = parsing.player_and_round_counts(gotha_string)
+    return {
+        "tournament": tournament_id,
+        "CL": header["CL"].upper() if "CL" in header else None,
+        "HA": header.get("HA"),
+        "KM": header.get("KM"),
+        "PC": header.get("PC"),
+        "players": players,
+        "rounds": rounds,
+        "content_hash": digest,
+    }
+
+
+def build_catalog(sources: Iterable[tuple[str, str]], previous: pl.DataFrame|None = None) -> pl.DataFrame:
+    """
+    Builds a catalog with one row per tournament from (tournament_id, gotha_string) pairs, without parsing any games.
+
+    Columns are tournament, CL, gor_weight, date(from tournament id), HA, KM, PC, players, rounds and content_hash.
+    Tournaments whose content hash matches their row in a `previous` catalog are taken from it instead of being
+    scanned again. The catalog can be kept between runs with `write_parquet` and `pl.read_parquet`.
+    """
+    known_hashes = dict(previous.select("tournament", "content_hash").iter_rows()) if previous is not None else {}
+    rows = []
+    reused = []
+    for tournament_id, gotha_string in sources:
+        digest = content_hash(gotha_string)
+        if known_hashes.get(tournament_id) == digest:
+            reused.append(tournament_id)
+        else:
+            rows.append(_catalog_row(tournament_id, gotha_string, digest))
+
+    scanned = pl.DataFrame(rows, schema={column: dtype for column, dtype in catalog_schema.items() if column not in ("gor_weight", "date")})
+    scanned = scanned.with_columns(
+        parsing.gor_weight_expression("CL"),
+        utils.tournament_date_from_id_expression("tournament").alias("date"),
+    ).select(list(catalog_schema))
+    if reused:
+        scanned = pl.concat([previous.filter(pl.col("tournament").is_in(reused)), scanned])
+    return scanned.sort("tournament")
+
+
+def filter_catalog(
+        catalog: pl.DataFrame,
+        classes: Iterable[str]|None = None,
+        date_from: date|None = None,
+        date_to: date|None = None,
+        place: str|None = None,
+        handicap_policy: str|None = None,
+) -> pl.DataFrame:
+    """
+    Selects tournaments by class(eg. ["A", "B"]), date range(inclusive), place(substring of PC, case insensitive)
+    and handicap policy(exact HA value, eg. "h9"). Arguments left as None don't filter.
+    """
+    condition = pl.lit(True)
+    if classes is not None:
+        condition &= pl.col("CL").is_in(list(classes))
+    if date_from is not None:
+        condition &= pl.col("date") >= date_from
+    if date_to is not None:
+        condition &= pl.col("date") <= date_to
+    if place is not None:
+        condition &= pl.col("PC").str.to_lowercase().str.contains(place.lower(), literal=True)
+    if handicap_policy is not None:
+        condition &= pl.col("HA") == handicap_policy
+    return catalog.filter(condition)
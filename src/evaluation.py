@@ -0,0 +1,174 @@
+from typing import Iterable
+
+import polars as pl
+import src.gor_calculator as gc
+import src.utils as utils
+
+# Predictions are clipped away from 0 and 1 so that log loss stays finite.
+PREDICTION_EPSILON = 1e-15
+
+# Additive per-group sums, metrics are derived from these, so partial statistics
+# from separate frames can be merged by summing.
+statistic_columns = ["games", "prediction_sum", "score_sum", "log_loss_sum", "brier_sum"]
+
+
+def rating_band_expression(gor_column: str|pl.Expr = "igor", band_width: int = 100, output_column: str = "rating_band") -> pl.Expr:
+    """
+    Returns a Polars expression bucketing gor into bands of `band_width`, labeled by the lower edge of the band.
+    """
+    gor_column = gc.column_name_to_expr(gor_column)
+    return ((gor_column / band_width).floor() * band_width).cast(pl.Int32).alias(output_column)
+
+
+def period_expression(tournament_id_column: str = "tournament", every: str = "1y", output_column: str = "period") -> pl.Expr:
+    """
+    Returns a Polars expression for the start of the time period(eg. "1y", "6mo") the tournament falls in.
+    """
+    return utils.tournament_date_from_id_expression(tournament_id_column).dt.truncate(every).alias(output_column)
+
+
+def _output_names(expressions: Iterable[str|pl.Expr]) -> list[str]:
+    return [expr if isinstance(expr, str) else expr.meta.output_name() for expr in expressions]
+
+
+def prediction_statistics(
+        games_df: pl.DataFrame|pl.LazyFrame,
+        predictions: Iterable[str|pl.Expr] = (gc.game_expected_result_expression(),),
+        result_column: str = "result",
+        group_by: Iterable[str|pl.Expr] = (),
+        calibration_bins: int = 10,
+) -> pl.DataFrame:
+    """
+    Computes additive prediction statistics for several predictions in one grouped pass.
+
+    Each prediction is a column or an expression giving the probability of the first player winning, its
+    output name is used as the "model" label. This way several rating columns can be compared in one pass,
+    for example `game_expected_result_expression("igor", "igor_opponent", output_column="igor")`.
+
+    Result is grouped by model, the given `group_by` columns or expressions(eg. `rating_band_expression()`,
+    "handicap", "gor_weight", `period_expression()`) and calibration bin. Columns:
+    - games: number of games with both prediction and result present
+    - prediction_sum, score_sum: sums of predictions and actual scores
+    - log_loss_sum, brier_sum: summed per-game log loss and squared error
+
+    Games frames list every game from both players' perspective. Both metrics are symmetric under swapping
+    the perspective, so this only weights each game twice.
+    """
+    predictions = list(predictions)
+    group_by = list(group_by)
+    model_names = _output_names(predictions)
+    group_names = _output_names(group_by)
+    bins = calibration_bins
+
+    return (
+        games_df.lazy()
+        .select(
+            *group_by,
+            gc.result_score_expression(result_column, output_column="score"),
+            *[(pl.col(p) if isinstance(p, str) else p).alias(name) for p, name in zip(predictions, model_names)],
+        )
+        .melt(id_vars=[*group_names, "score"], value_vars=model_names, variable_name="model", value_name="prediction")
+        .filter(pl.col("score").is_not_null() & pl.col("prediction").is_not_null() & pl.col("prediction").is_not_nan())
+        .with_columns(pl.col("prediction").clip(PREDICTION_EPSILON, 1 - PREDICTION_EPSILON))
+        .with_columns(
+            (pl.col("prediction") * bins).floor().clip(0, bins - 1).cast(pl.Int32).alias("calibration_bin"),
+            -(pl.col("score") * pl.col("prediction").log() + (1 - pl.col("score")) * (1 - pl.col("prediction")).log()).alias("log_loss"),
+            (pl.col("prediction") - pl.col("score")).pow(2).alias("brier"),
+        )
+        .group_by(["model", *group_names, "calibration_bin"])
+        .agg(
+            pl.len().cast(pl.Int64).alias("games"),
+            pl.col("prediction").sum().alias("prediction_sum"),
+            pl.col("score").sum().alias("score_sum"),
+            pl.col("log_loss").sum().alias("log_loss_sum"),
+            pl.col("brier").sum().alias("brier_sum"),
+        )
+        .collect()
+    )
+
+
+def merge_prediction_statistics(*statistics: pl.DataFrame) -> pl.DataFrame:
+    """
+    Merges partial statistics from `prediction_statistics` by summing them per group.
+    """
+    merged = pl.concat(statistics)
+    keys = [column for column in merged.columns if column not in statistic_columns]
+    return merged.group_by(keys).agg(pl.col(statistic_columns).sum())
+
+
+def stream_prediction_statistics(frames: Iterable[pl.DataFrame|pl.LazyFrame], **kwargs) -> pl.DataFrame:
+    """
+    Computes `prediction_statistics` over an iterable of frames, eg. one archive file or variant at a time,
+    keeping only the running aggregate in memory. Keyword arguments are passed to `prediction_statistics`.
+
+    An empty iterable gives empty statistics, with group columns of unknown(null) type.
+    """
+    accumulated = None
+    for frame in frames:
+        statistics = prediction_statistics(frame, **kwargs)
+        accumulated = statistics if accumulated is None else merge_prediction_statistics(accumulated, statistics)
+    if accumulated is None:
+        return pl.DataFrame(schema={
+            "model": pl.String,
+            **{name: pl.Null for name in _output_names(kwargs.get("group_by", ()))},
+            "calibration_bin": pl.Int32,
+            "games": pl.Int64,
+            **{column: pl.Float64 for column in statistic_columns[1:]},
+        })
+    return accumulated
+
+
+def _metric_expressions() -> list[pl.Expr]:
+    return [
+        pl.col("games"),
+        (pl.col("log_loss_sum") / pl.col("games")).alias("log_loss"),
+        (pl.col("brier_sum") / pl.col("games")).alias("brier_score"),
+        (pl.col("prediction_sum") / pl.col("games")).alias("mean_prediction"),
+        (pl.col("score_sum") / pl.col("games")).alias("mean_score"),
+    ]
+
+
+def prediction_metrics(statistics: pl.DataFrame, by: Iterable[str] = ()) -> pl.DataFrame:
+    """
+    Log loss, Brier score, mean prediction and mean score per model, further broken down by the `by` columns.
+    """
+    keys = ["model", *by]
+    return (
+        statistics.group_by(keys)
+        .agg(pl.col(statistic_columns).sum())
+        .select(*keys, *_metric_expressions())
+        .sort(keys)
+    )
+
+
+def calibration_curve(statistics: pl.DataFrame, by: Iterable[str] = ()) -> pl.DataFrame:
+    """
+    Mean prediction against mean actual score per calibration bin, for each model and `by` group.
+    """
+    keys = ["model", *by, "calibration_bin"]
+    return (
+        statistics.group_by(keys)
+        .agg(pl.col(statistic_columns).sum())
+        .select(*keys, *_metric_expressions())
+        .sort(keys)
+    )
+
+
+def rolling_prediction_metrics(statistics: pl.DataFrame, window: str, period_column: str = "period", by: Iterable[str] = ()) -> pl.DataFrame:
+    """
+    Metrics over a rolling time window, eg. window="3y" on statistics grouped by `period_expression(every="1y")`.
+
+    Each row covers the periods in (period - window, period].
+    """
+    keys = ["model", *by]
+    per_period = (
+        statistics.group_by([*keys, period_column])
+        .agg(pl.col(statistic_columns).sum())
+        .sort(period_column)
+    )
+    return (
+        per_period.rolling(index_column=period_column, period=window, group_by=keys)
+        .agg(pl.col(statistic_columns).sum())
+        .select(*keys, period_column, *_metric_expressions())
+        .sort([*keys, period_column])
+    )
@@ -0,0 +1,193 @@
+import warnings
+from statistics import NormalDist
+from typing import Callable, Iterable
+
+import numpy as np
+import polars as pl
+import src.gor_calculator as gc
+
+# Parameters of the expected result formula, with the values used by EGD.
+#   adjusted_gor = gor + (handicap_stone * handicap - handicap_offset), for black in handicap games
+#   beta = -beta_scale * log(beta_offset - adjusted_gor)
+egd_parameters = {
+    "beta_scale": 7.0,
+    "beta_offset": 3300.0,
+    "handicap_stone": 100.0,
+    "handicap_offset": 50.0,
+}
+
+GamesSource = pl.DataFrame | Callable[[], Iterable[pl.DataFrame]]
+
+
+def _game_batches(games: GamesSource, batch_size: int) -> Iterable[pl.DataFrame]:
+    if isinstance(games, pl.DataFrame):
+        return games.iter_slices(batch_size)
+    return games()
+
+
+def _batch_arrays(batch: pl.DataFrame, gor_column: str, gor_opponent_column: str, handicap_column: str,
+                  color_column: str, result_column: str) -> tuple[np.ndarray, ...]:
+    batch = batch.select(
+        pl.col(gor_column).cast(pl.Float64).alias("gor"),
+        pl.col(gor_opponent_column).cast(pl.Float64).alias("gor_opponent"),
+        pl.col(handicap_column).fill_null(0).cast(pl.Float64).alias("handicap"),
+        ((pl.col(color_column) == "b") & (pl.col(handicap_column) > 0)).fill_null(False).alias("handicapped"),
+        ((pl.col(color_column) == "w") & (pl.col(handicap_column) > 0)).fill_null(False).alias("handicapped_opponent"),
+        gc.result_score_expression(result_column).cast(pl.Float64),
+    ).drop_nulls()
+    return tuple(batch[column].to_numpy() for column in batch.columns)
+
+
+def expected_result_gradient(parameters: dict[str, float], gor: np.ndarray, gor_opponent: np.ndarray, handicap: np.ndarray,
+                             handicapped: np.ndarray, handicapped_opponent: np.ndarray) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+    """
+    Expected results under the given parameters, together with analytic derivatives of the
+    logit(beta - beta_opponent) with respect to each parameter.
+
+    `handicapped` marks games where the player has black and handicap > 0, `handicapped_opponent` the same for the opponent.
+    """
+    scale = parameters["beta_scale"]
+    offset = parameters["beta_offset"]
+    shift = parameters["handicap_stone"] * handicap - parameters["handicap_offset"]
+    distance = offset - np.where(handicapped, gor + shift, gor)
+    distance_opponent = offset - np.where(handicapped_opponent, gor_opponent + shift, gor_opponent)
+    if np.any(distance <= 0) or np.any(distance_opponent <= 0):
+        raise ValueError(f"beta_offset {offset} must be above every adjusted gor")
+
+    log_distance = np.log(distance)
+    log_distance_opponent = np.log(distance_opponent)
+    logit = scale * (log_distance_opponent - log_distance)
+    expected = 1 / (1 + np.exp(-logit))
+
+    # d(beta)/d(adjusted_gor) for each side
+    slope = np.where(handicapped, scale / distance, 0.0)
+    slope_opponent = np.where(handicapped_opponent, scale / distance_opponent, 0.0)
+    gradient = {
+        "beta_scale": log_distance_opponent - log_distance,
+        "beta_offset": scale / distance_opponent - scale / distance,
+        "handicap_stone": (slope - slope_opponent) * handicap,
+        "handicap_offset": slope_opponent - slope,
+    }
+    return expected, gradient
+
+
+def fit_expected_result_parameters(
+        games: GamesSource,
+        parameters: Iterable[str] = ("beta_scale", "beta_offset"),
+        initial_parameters: dict[str, float] = egd_parameters,
+        gor_column: str = "igor",
+        gor_opponent_column: str = "igor_opponent",
+        handicap_column: str = "handicap",
+        color_column: str = "color",
+        result_column: str = "result",
+        batch_size: int = 1_000_000,
+        max_iterations: int = 50,
+        tolerance: float = 1e-8,
+        confidence: float = 0.95,
+) -> pl.DataFrame:
+    """
+    Fits constants of the expected result formula by maximizing likelihood of the observed results.
+
+    Uses Fisher scoring: each iteration streams over the games in batches of `batch_size`, accumulating
+    the score vector and Fisher information from analytic gradients, so memory use is bounded by the batch
+    size. `games` is either a DataFrame, or a callable returning a fresh iterable of frames for each pass,
+    eg. reading the archive one file at a time. Draws count as half a win.
+
+    Only parameters listed in `parameters` are fitted, others are held at `initial_parameters`. Handicap
+    parameters("handicap_stone", "handicap_offset") need handicap games in the data to be identifiable,
+    ValueError is raised for parameters the data can't identify. Rating volatility and bonus constants
+    don't affect the likelihood of results given ratings, so they are not fitted here.
+
+    Games frames list every game from both sides, which double counts the evidence. For honest
+    confidence intervals pass each game once, eg. by filtering on `pin < opponent_pin`.
+
+    Returns a DataFrame with columns parameter, estimate, std_error, ci_lower, ci_upper, iterations and
+    converged. A warning is issued if `tolerance` wasn't reached within `max_iterations`, or if the
+    likelihood has no maximum inside the valid region(eg. results that always follow the gor order),
+    in which case the estimate is the boundary reached, converged is False and std_error is null.
+    """
+    parameters = list(parameters)
+    current = dict(initial_parameters)
+    columns = (gor_column, gor_opponent_column, handicap_column, color_column, result_column)
+    # Highest gor of players whose gor isn't adjusted, and highest gor per handicap of players who are.
+    # Together they bound the adjusted gors for any parameter values.
+    max_gor = -np.inf
+    max_handicapped_gor: dict[float, float] = {}
+
+    def max_adjusted_gor(values: dict[str, float]) -> float:
+        return max([max_gor] + [
+            gor + values["handicap_stone"] * handicap - values["handicap_offset"] for handicap, gor in max_handicapped_gor.items()
+        ])
+
+    def accumulate(values: dict[str, float]) -> tuple[np.ndarray, np.ndarray]:
+        nonlocal max_gor
+        information = np.zeros((len(parameters), len(parameters)))
+        score = np.zeros(len(parameters))
+        for batch in _game_batches(games, batch_size):
+            gor, gor_opponent, handicap, handicapped, handicapped_opponent, result = _batch_arrays(batch, *columns)
+            if len(gor) == 0:
+                continue
+            expected, gradient = expected_result_gradient(values, gor, gor_opponent, handicap, handicapped, handicapped_opponent)
+            jacobian = np.column_stack([gradient[name] for name in parameters])
+            information += jacobian.T @ (jacobian * (expected * (1 - expected))[:, None])
+            score += jacobian.T @ (result - expected)
+
+            plain = np.concatenate([gor[~handicapped], gor_opponent[~handicapped_opponent]])
+            if len(plain) > 0:
+                max_gor = max(max_gor, plain.max())
+            for side_gor, side_handicapped in ((gor, handicapped), (gor_opponent, handicapped_opponent)):
+                for value in np.unique(handicap[side_handicapped]):
+                    side_max = side_gor[side_handicapped & (handicap == value)].max()
+                    max_handicapped_gor[value] = max(max_handicapped_gor.get(value, -np.inf), side_max)
+        return information, score
+
+    information, score = accumulate(current)
+    if np.linalg.matrix_rank(information) < len(parameters):
+        unidentified = [name for name, value in zip(parameters, np.diag(information)) if value <= 0] or parameters
+        raise ValueError(f"Parameters {unidentified} can't be identified from the given games")
+
+    converged = False
+    at_boundary = False
+    iterations = 0
+    while iterations < max_iterations:
+        iterations += 1
+        step = np.linalg.solve(information, score)
+        values = np.array([current[name] for name in parameters])
+        # Convergence is judged on the full Fisher step, before any halving shortens it.
+        if np.max(np.abs(step) / np.maximum(np.abs(values), 1.0)) < tolerance:
+            converged = True
+            break
+        # Halve the step until beta_offset stays above every adjusted gor, where the formula is defined.
+        candidate = dict(current, **dict(zip(parameters, values + step)))
+        while candidate["beta_offset"] <= max_adjusted_gor(candidate):
+            step /= 2
+            if np.max(np.abs(step) / np.maximum(np.abs(values), 1.0)) < tolerance:
+                # The likelihood keeps increasing towards the boundary, there is no interior optimum.
+                at_boundary = True
+                break
+            candidate = dict(current, **dict(zip(parameters, values + step)))
+        if at_boundary:
+            break
+        current = candidate
+        information, score = accumulate(current)
+
+    estimate = np.array([current[name] for name in parameters])
+    if at_boundary:
+        warnings.warn("Parameter fit reached the boundary where beta_offset equals the highest adjusted gor, "
+                      "the estimate is a bound and has no standard error")
+        std_error = np.full(len(parameters), np.nan)
+    else:
+        if not converged:
+            warnings.warn(f"Parameter fit did not converge within {max_iterations} iterations")
+        # Information was accumulated at the current parameters, by the last pass over the games.
+        std_error = np.sqrt(np.diag(np.linalg.inv(information)))
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    return pl.DataFrame({
+        "parameter": parameters,
+        "estimate": estimate,
+        "std_error": std_error,
+        "ci_lower": estimate - z * std_error,
+        "ci_upper": estimate + z * std_error,
+        "iterations": [iterations] * len(parameters),
+        "converged": [converged] * len(parameters),
+    }).fill_nan(None)
@@ -0,0 +1,174 @@
+import os
+from dataclasses import dataclass, fields
+from datetime import date
+
+import numpy as np
+import polars as pl
+import src.gor_calculator as gc
+import src.utils as utils
+
+
+@dataclass
+class HeadToHead:
+    """
+    Aggregated results between pairs of players, as a CSR sparse matrix over dense player ids.
+
+    Row i holds player `pins[i]`'s results against each opponent in `indices[indptr[i]:indptr[i + 1]]`, with
+    counts in the matching slices of the count arrays:
+    - wins, losses, draws: results from the row player's perspective
+    - handicap_games: games played with handicap
+    - handicap_score: score(1 per win, 0.5 per jigo) of the row player in handicap games
+    - handicap_stones: sum of handicap stones, positive when the row player took black, negative when they gave them
+
+    Results of even games are the totals minus the handicap counts.
+    """
+    pins: np.ndarray
+    indptr: np.ndarray
+    indices: np.ndarray
+    wins: np.ndarray
+    losses: np.ndarray
+    draws: np.ndarray
+    handicap_games: np.ndarray
+    handicap_score: np.ndarray
+    handicap_stones: np.ndarray
+
+    def player_ids(self, pins) -> np.ndarray:
+        """
+        Dense ids of the given pins, -1 for pins not in the matrix.
+        """
+        pins = np.asarray(pins)
+        if len(self.pins) == 0:
+            return np.full(len(pins), -1)
+        sorter = np.argsort(self.pins)
+        ids = sorter[np.minimum(np.searchsorted(self.pins, pins, sorter=sorter), len(self.pins) - 1)]
+        return np.where(self.pins[ids] == pins, ids, -1)
+
+    def row(self, pin: int) -> pl.DataFrame:
+        """
+        Results of one player against each of their opponents.
+        """
+        player_id = self.player_ids([pin])[0]
+        if player_id < 0:
+            raise KeyError(pin)
+        start, end = self.indptr[player_id], self.indptr[player_id + 1]
+        return pl.DataFrame({
+            "opponent_pin": self.pins[self.indices[start:end]],
+            **{field: getattr(self, field)[start:end] for field in count_fields},
+        })
+
+
+count_fields = ["wins", "losses", "draws", "handicap_games", "handicap_score", "handicap_stones"]
+count_dtypes = {
+    "wins": np.int32,
+    "losses": np.int32,
+    "draws": np.int32,
+    "handicap_games": np.int32,
+    "handicap_score": np.float64,
+    "handicap_stones": np.int32,
+}
+
+
+def _dense_ids(known_pins: np.ndarray, pins: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Extends `known_pins` with the new pins(in sorted order) and returns it, with dense ids of `pins`.
+    """
+    unique_pins = np.unique(pins)
+    sorter = np.argsort(known_pins)
+    positions = np.minimum(np.searchsorted(known_pins, unique_pins, sorter=sorter), max(len(known_pins) - 1, 0))
+    is_known = (known_pins[sorter[positions]] == unique_pins) if len(known_pins) > 0 else np.zeros(len(unique_pins), dtype=bool)
+    all_pins = np.concatenate([known_pins, unique_pins[~is_known]]).astype(np.int64)
+    sorter = np.argsort(all_pins)
+    return all_pins, sorter[np.searchsorted(all_pins, pins, sorter=sorter)]
+
+
+def _from_coordinates(pins: np.ndarray, rows: np.ndarray, columns: np.ndarray, counts: dict[str, np.ndarray]) -> HeadToHead:
+    """
+    Sums counts with the same (row, column) and packs them into CSR form.
+    """
+    n = len(pins)
+    keys, inverse = np.unique(rows.astype(np.int64) * n + columns, return_inverse=True)
+    summed = {
+        field: np.bincount(inverse, weights=counts[field], minlength=len(keys)).astype(count_dtypes[field])
+        for field in count_fields
+    }
+    return HeadToHead(
+        pins=pins,
+        indptr=np.concatenate([[0], np.cumsum(np.bincount(keys // n, minlength=n))]).astype(np.int64),
+        indices=(keys % n).astype(np.int32),
+        **summed,
+    )
+
+
+def _coordinates(h2h: HeadToHead) -> tuple[np.ndarray, np.ndarray]:
+    return np.repeat(np.arange(len(h2h.pins)), np.diff(h2h.indptr)), h2h.indices
+
+
+def _game_counts(games_df: pl.DataFrame, start: date|None, end: date|None) -> pl.DataFrame:
+    condition = pl.col("pin").is_not_null() & pl.col("opponent_pin").is_not_null() & pl.col("result").is_in(["+", "-", "="])
+    if start is not None or end is not None:
+        tournament_date = utils.tournament_date_from_id_expression("tournament")
+        if start is not None:
+            condition &= tournament_date >= start
+        if end is not None:
+            condition &= tournament_date < end
+    handicapped = pl.col("handicap").fill_null(0) > 0
+    return games_df.filter(condition).select(
+        "pin",
+        "opponent_pin",
+        (pl.col("result") == "+").cast(pl.Int32).alias("wins"),
+        (pl.col("result") == "-").cast(pl.Int32).alias("losses"),
+        (pl.col("result") == "=").cast(pl.Int32).alias("draws"),
+        handicapped.cast(pl.Int32).alias("handicap_games"),
+        pl.when(handicapped).then(gc.result_score_expression("result")).otherwise(0.0).cast(pl.Float64).alias("handicap_score"),
+        pl.when(handicapped & (pl.col("color") == "b")).then(pl.col("handicap"))
+            .when(handicapped & (pl.col("color") == "w")).then(-pl.col("handicap"))
+            .otherwise(0).cast(pl.Int32).alias("handicap_stones"),
+    )
+
+
+def append_games(h2h: HeadToHead|None, games_df: pl.DataFrame, start: date|None = None, end: date|None = None) -> HeadToHead:
+    """
+    Adds games to a head-to-head matrix, or builds a new one when `h2h` is None.
+
+    Games need columns tournament, pin, opponent_pin, result, handicap and color. Games frames list every game
+    from both players' perspectives, so both players' rows get updated. Only games of tournaments dated in
+    [start, end) are counted, when given. Existing players keep their ids, new players get ids after them.
+    """
+    counts_df = _game_counts(games_df, start, end)
+    known_pins = h2h.pins if h2h is not None else np.array([], dtype=np.int64)
+    pins, ids = _dense_ids(known_pins, np.concatenate([counts_df["pin"].to_numpy(), counts_df["opponent_pin"].to_numpy()]))
+    rows, columns = ids[:counts_df.height], ids[counts_df.height:]
+    counts = {field: counts_df[field].to_numpy() for field in count_fields}
+
+    if h2h is not None:
+        existing_rows, existing_columns = _coordinates(h2h)
+        rows = np.concatenate([existing_rows, rows])
+        columns = np.concatenate([existing_columns, columns])
+        counts = {field: np.concatenate([getattr(h2h, field), counts[field]]) for field in count_fields}
+    return _from_coordinates(pins, rows, columns, counts)
+
+
+def build_head_to_head(games_df: pl.DataFrame, start: date|None = None, end: date|None = None) -> HeadToHead:
+    """
+    Head-to-head matrix of games in tournaments dated in [start, end), or of all games.
+    """
+    return append_games(None, games_df, start, end)
+
+
+def save_head_to_head(h2h: HeadToHead, directory: str) -> None:
+    """
+    Saves each array of the matrix as a .npy file in `directory`.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for field in fields(HeadToHead):
+        np.save(os.path.join(directory, f"{field.name}.npy"), getattr(h2h, field.name))
+
+
+def load_head_to_head(directory: str, mmap_mode: str|None = "r") -> HeadToHead:
+    """
+    Loads a matrix saved with `save_head_to_head`, memory-mapping the arrays by default.
+    """
+    return HeadToHead(**{
+        field.name: np.load(os.path.join(directory, f"{field.name}.npy"), mmap_mode=mmap_mode)
+        for field in fields(HeadToHead)
+    })
@@ -0,0 +1,165 @@
+import unicodedata
+from difflib import SequenceMatcher
+
+import polars as pl
+import src.utils as utils
+
+# Weights of name, rank and country similarity in the confidence score. Without country
+# information the remaining weights are renormalized.
+NAME_WEIGHT = 0.6
+RANK_WEIGHT = 0.3
+COUNTRY_WEIGHT = 0.1
+# Rank similarity halves for every this many ranks of difference.
+RANK_HALF_DISTANCE = 2
+
+assignment_key = ["tournament", "surname", "first_name", "rank"]
+assignment_schema = {
+    "tournament": pl.String,
+    "surname": pl.String,
+    "first_name": pl.String,
+    "rank": pl.String,
+    "pin": pl.Int64,
+    "confidence": pl.Float64,
+}
+
+
+def normalize_name(name: str|None) -> str|None:
+    """
+    Lowercases the name and strips accents and anything that isn't a letter, so "Müller-Lüdenscheidt" and
+    "Muller Ludenscheidt" normalize the same.
+    """
+    if name is None:
+        return None
+    decomposed = unicodedata.normalize("NFKD", name)
+    return "".join(c for c in decomposed if c.isalpha() and not unicodedata.combining(c)).lower()
+
+
+def _with_normalized_names(df: pl.DataFrame) -> pl.DataFrame:
+    names = pl.concat([df["surname"], df["first_name"]]).unique().drop_nulls()
+    normalized = pl.DataFrame({"name": names, "normalized": [normalize_name(name) for name in names]})
+    for column in ("surname", "first_name"):
+        df = df.join(normalized.rename({"name": column, "normalized": f"{column}_key"}), on=column, how="left", coalesce=True)
+    return df.with_columns(
+        utils.rank_comparison_number_expression("rank").alias("rank_number"),
+    )
+
+
+def _blocking_keys(df: pl.DataFrame) -> pl.DataFrame:
+    """
+    Adds "block" column with surname key and first initial. Each record gets a second block with the
+    names swapped, as surname and first name are sometimes entered the wrong way around.
+    """
+    return pl.concat([
+        df.with_columns((pl.col("surname_key") + "|" + pl.col("first_name_key").str.slice(0, 1)).alias("block")),
+        df.with_columns((pl.col("first_name_key") + "|" + pl.col("surname_key").str.slice(0, 1)).alias("block")),
+    ]).filter(pl.col("block").is_not_null())
+
+
+def player_records(games_df: pl.DataFrame) -> pl.DataFrame:
+    """
+    Distinct player entries of each tournament, with pin where one is known.
+    """
+    columns = [*assignment_key, "pin"] + (["country"] if "country" in games_df.columns else [])
+    return games_df.select(columns).unique(maintain_order=True)
+
+
+def match_missing_pins(games_df: pl.DataFrame, min_confidence: float = 0.8) -> pl.DataFrame:
+    """
+    Assigns pins to player entries that have none, by matching them against entries with known pins.
+
+    Candidates are only compared within blocks sharing the normalized surname and first initial, so the
+    work grows with block sizes instead of quadratically with the number of entries. Each candidate is
+    scored by name similarity, rank difference and, if a "country" column is present, matching country.
+    Pins already used by another entry of the same tournament are never assigned, and each pin goes to at
+    most one entry of a tournament. The best scoring pin is kept if its confidence is at least `min_confidence`.
+
+    Returns a pin assignment table with columns tournament, surname, first_name, rank, pin and confidence.
+    """
+    records = _with_normalized_names(player_records(games_df))
+    has_country = "country" in records.columns
+    unmatched = _blocking_keys(records.filter(pl.col("pin").is_null()).drop("pin"))
+    known = _blocking_keys(records.filter(pl.col("pin").is_not_null()).drop("tournament")).unique()
+
+    # A pin already playing in the tournament belongs to another entry, so it can't be this one.
+    present = records.filter(pl.col("pin").is_not_null()).select("tournament", "pin").unique()
+    candidates = unmatched.join(known, on="block", suffix="_known").join(present, on=["tournament", "pin"], how="anti")
+    if candidates.is_empty():
+        return pl.DataFrame(schema=assignment_schema)
+
+    # Swapped names are as good a match as names in the right order.
+    name_similarity = [
+        max(
+            SequenceMatcher(None, f"{surname} {first_name}", f"{known_surname} {known_first_name}").ratio(),
+            SequenceMatcher(None, f"{surname} {first_name}", f"{known_first_name} {known_surname}").ratio(),
+        )
+        for surname, first_name, known_surname, known_first_name in candidates.select(
+            "surname_key", "first_name_key", "surname_key_known", "first_name_key_known"
+        ).fill_null("").iter_rows()
+    ]
+    candidates = candidates.with_columns(
+        pl.Series("name_similarity", name_similarity, dtype=pl.Float64),
+        (0.5 ** ((pl.col("rank_number") - pl.col("rank_number_known")).abs() / RANK_HALF_DISTANCE)).fill_null(0.5).alias("rank_similarity"),
+    )
+    if has_country:
+        candidates = candidates.with_columns(
+            pl.when(pl.col("country").is_null() | pl.col("country_known").is_null()).then(0.5)
+                .when(pl.col("country").str.to_uppercase() == pl.col("country_known").str.to_uppercase()).then(1.0)
+                .otherwise(0.0).alias("country_similarity"),
+        )
+        confidence = (
+            NAME_WEIGHT * pl.col("name_similarity") + RANK_WEIGHT * pl.col("rank_similarity") + COUNTRY_WEIGHT * pl.col("country_similarity")
+        )
+    else:
+        confidence = (
+            (NAME_WEIGHT * pl.col("name_similarity") + RANK_WEIGHT * pl.col("rank_similarity")) / (NAME_WEIGHT + RANK_WEIGHT)
+        )
+
+    candidates = (
+        candidates.with_columns(confidence.alias("confidence"))
+        .group_by([*assignment_key, "pin"]).agg(pl.col("confidence").max())
+        .filter(pl.col("confidence") >= min_confidence)
+        .sort(["confidence", *assignment_key, "pin"], descending=[True, False, False, False, False, False], nulls_last=True)
+    )
+    # Each pin goes to at most one entry of a tournament. Entries take their best pin in order of confidence,
+    # an entry whose best pin went to a more confident entry falls back to its next candidate.
+    assignments = []
+    while not candidates.is_empty():
+        best = candidates.unique(assignment_key, keep="first", maintain_order=True).unique(["tournament", "pin"], keep="first", maintain_order=True)
+        assignments.append(best)
+        candidates = candidates.join(best, on=assignment_key, how="anti", join_nulls=True).join(best, on=["tournament", "pin"], how="anti")
+    if not assignments:
+        return pl.DataFrame(schema=assignment_schema)
+    return pl.concat(assignments).select(list(assignment_schema)).sort(assignment_key)
+
+
+def update_pin_assignments(games_df: pl.DataFrame, previous: pl.DataFrame|None = None, min_confidence: float = 0.8) -> pl.DataFrame:
+    """
+    Extends a pin assignment table from an earlier run, only matching entries that aren't in it yet.
+
+    The table can be stored between runs with `write_parquet` and read back with `pl.read_parquet`.
+    """
+    if previous is None or previous.is_empty():
+        return match_missing_pins(games_df, min_confidence)
+    games_df = games_df.join(previous.select(assignment_key), on=assignment_key, how="anti", join_nulls=True)
+    return pl.concat([previous, match_missing_pins(games_df, min_confidence)]).sort(assignment_key)
+
+
+def apply_pin_assignments(games_df: pl.DataFrame, assignments: pl.DataFrame) -> pl.DataFrame:
+    """
+    Fills missing pin and opponent_pin values in a games frame from a pin assignment table.
+    """
+    pins = assignments.select(*assignment_key, pl.col("pin").alias("assigned_pin"))
+    opponent_pins = pins.rename({
+        "surname": "opponent_surname",
+        "first_name": "opponent_first_name",
+        "rank": "opponent_rank",
+        "assigned_pin": "assigned_opponent_pin",
+    })
+    return games_df.join(
+        pins, on=assignment_key, how="left", join_nulls=True, coalesce=True
+    ).join(
+        opponent_pins, on=["tournament", "opponent_surname", "opponent_first_name", "opponent_rank"], how="left", join_nulls=True, coalesce=True
+    ).with_columns(
+        pl.coalesce("pin", "assigned_pin").alias("pin"),
+        pl.coalesce("opponent_pin", "assigned_opponent_pin").alias("opponent_pin"),
+    ).drop("assigned_pin", "assigned_opponent_pin")
@@ -18,11 +18,15 @@ def parse_pin(s: str):
     return None
 
 
+def is_player_line(line: str) -> bool:
+    return len(line.strip()) > 20 and not line[5:20].strip() == '' and not line.strip() == '' and not line.strip().startswith(";")
+
+
 def parse_gotha_games(gotha_string: str, tournament_id: str|None = None) -> pl.DataFrame:
     # Extract lines that aren't empty, aren't whitespace when name is supposed to be found, not comments and have a pin. Properly 
     # formatted ones should just be not comments, ie. start with ";", but other requirements are needed because data is borked.
     line_list = gotha_string.split("\n")
-    line_list = list(filter(lambda x: len(x.strip()) > 20 and not x[5:20].strip() == '' and not x.strip() == '' and not x.strip().startswith(";"), line_list))
+    line_list = list(filter(is_player_line, line_list))
     
     # Pins aren't always present, so we extract what we can, and focus on things that are always present.
     pins = map(parse_pin, line_list)
@@ -201,16 +205,60 @@ def tournament_info(gotha_string: str) -> pl.DataFrame:
             pl.lit(None).alias("CL")
         )
     metadata_df = metadata_df.with_columns(
-        pl.when(pl.col("CL") == "A")
+        gor_weight_expression("CL"),
+    )
+    return metadata_df
+
+def gor_weight_expression(class_column: str = "CL") -> pl.Expr:
+    """
+    Gor weight of tournament class, A: 1.0, B: 0.75, C: 0.5, D: 0.25, others 0.
+    """
+    return (
+        pl.when(pl.col(class_column) == "A")
         .then(1.0)
-        .when(pl.col("CL") == "B")
+        .when(pl.col(class_column) == "B")
         .then(0.75)
-        .when(pl.col("CL") == "C")
+        .when(pl.col(class_column) == "C")
         .then(0.5)
-        .when(pl.col("CL") == "D")
+        .when(pl.col(class_column) == "D")
         .then(0.25)
         .otherwise(0)
         .cast(pl.Float64)
-        .alias("gor_weight"),
+        .alias("gor_weight")
+    )
+
+metadata_pattern_re = re.compile(metadata_pattern)
+game_result_pattern_re = re.compile(game_result_pattern_string)
+
+def tournament_header(gotha_string: str) -> dict[str, str]:
+    """
+    Metadata of the tournament("CL", "HA", "KM", ...) read from the header only, stopping at the first player line.
+
+    Much cheaper than `tournament_info` when games aren't needed. Keys are uppercase, for repeated keys the first
+    value is kept.
+    """
+    header = {}
+    for line in gotha_string.split("\n"):
+        if is_player_line(line):
+            break
+        match = metadata_pattern_re.search(line)
+        if match:
+            header.setdefault(match.group("key").upper(), match.group("value"))
+    return header
+
+def player_and_round_counts(gotha_string: str) -> tuple[int, int]:
+    """
+    Number of players and rounds, from a light scan of the player lines without building any DataFrames.
+
+    Rounds are counted the way `parse_gotha_games` finds them: lines are cut to the shortest line to drop
+    ghost columns, and every column after the name where all lines hold a result is a round.
+    """
+    lines_split = [line.split("|")[0].split() for line in gotha_string.split("\n") if is_player_line(line)]
+    if not lines_split:
+        return 0, 0
+    min_cols = min(map(len, lines_split))
+    rounds = sum(
+        all(game_result_pattern_re.search(tokens[column]) for tokens in lines_split)
+        for column in range(3, min_cols)
     )
-    return metadata_df
\ No newline at end of file
+    return len(lines_split), rounds
\ No newline at end of file
@@ -0,0 +1,115 @@
+import heapq
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import polars as pl
+import src.replay as replay
+import src.utils as utils
+from src.rating_models import RatingModel
+
+
+def player_components(pins: np.ndarray, opponent_pins: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Connected components of the player-opponent graph given as two arrays of pins, one edge per game.
+
+    Returns sorted unique pins and a component label for each of them. Label is the index of the
+    smallest pin in the component, so labels are deterministic.
+    """
+    players, inverse = np.unique(np.concatenate([pins, opponent_pins]), return_inverse=True)
+    left, right = inverse[:len(pins)], inverse[len(pins):]
+    labels = np.arange(len(players))
+    while True:
+        previous = labels
+        labels = labels.copy()
+        np.minimum.at(labels, left, labels[right])
+        np.minimum.at(labels, right, labels[left])
+        # Pointer jumping, labels always point to a smaller index in the same component.
+        labels = labels[labels]
+        if np.array_equal(labels, previous):
+            return players, labels
+
+
+def partition_games(games_df: pl.DataFrame, every: str = "1y") -> list[list[pl.DataFrame]]:
+    """
+    Splits games into time windows of length `every`, and each window into independent player components.
+
+    Players in different components of a window never meet in it, so their games can be replayed separately.
+    Windows are in chronological order, components within a window are ordered by their smallest pin.
+    """
+    games_df = games_df.filter(pl.col("pin").is_not_null() & pl.col("opponent_pin").is_not_null()).with_columns(
+        utils.tournament_date_from_id_expression("tournament").dt.truncate(every).alias("window")
+    )
+    windows = []
+    for window_df in games_df.sort("window", maintain_order=True).partition_by("window", maintain_order=True, include_key=False):
+        players, labels = player_components(window_df["pin"].to_numpy(), window_df["opponent_pin"].to_numpy())
+        components = labels[np.searchsorted(players, window_df["pin"].to_numpy())]
+        window_df = window_df.with_columns(pl.Series("component", components))
+        windows.append([
+            component_df.drop("component")
+            for component_df in window_df.sort("component", maintain_order=True).partition_by("component", maintain_order=True)
+        ])
+    return windows
+
+
+def _pack_components(components: list[pl.DataFrame], chunks: int) -> list[pl.DataFrame]:
+    """
+    Packs components into at most `chunks` frames of roughly equal size, largest components first.
+    """
+    loads = [(0, i, []) for i in range(min(chunks, len(components)))]
+    for index in sorted(range(len(components)), key=lambda i: (-components[i].height, i)):
+        load, i, members = heapq.heappop(loads)
+        members.append(index)
+        heapq.heappush(loads, (load + components[index].height, i, members))
+    return [pl.concat([components[index] for index in sorted(members)]) for _, _, members in sorted(loads, key=lambda x: x[1])]
+
+
+def parallel_replay_ratings(
+        games_df: pl.DataFrame,
+        initial_ratings: dict[int, float|tuple]|None = None,
+        every: str = "1y",
+        max_workers: int|None = None,
+        gor_weight_column: str = "gor_weight",
+        model: RatingModel|None = None,
+        batch_by: str = "tournament",
+) -> tuple[pl.DataFrame, dict[int, float|tuple]]:
+    """
+    Same result as `replay.replay_ratings`, computed by replaying independent player components in parallel.
+
+    Windows are replayed one after another. Within a window, components are packed into one chunk per worker
+    and replayed on a process pool, each starting from the current ratings of its players. Results are merged
+    back in a fixed order, so the output is identical to a serial replay. `model` and `batch_by` are passed
+    on to `replay.replay_ratings`.
+    """
+    ratings = dict(initial_ratings) if initial_ratings is not None else {}
+    max_workers = max_workers or os.cpu_count() or 1
+    pool = None
+    events = []
+    try:
+        for components in partition_games(games_df, every):
+            chunks = _pack_components(components, max_workers)
+            chunk_ratings = [
+                {pin: ratings[pin] for pin in chunk["pin"].unique() if pin in ratings}
+                for chunk in chunks
+            ]
+            if len(chunks) == 1:
+                results = [replay.replay_ratings(chunks[0], chunk_ratings[0], gor_weight_column, model, batch_by)]
+            else:
+                # Polars runs its own thread pool, so forked workers can deadlock. Spawn them instead.
+                if pool is None:
+                    pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+                futures = [pool.submit(replay.replay_ratings, chunk, initial, gor_weight_column, model, batch_by) for chunk, initial in zip(chunks, chunk_ratings)]
+                results = [future.result() for future in futures]
+            for chunk_events, updated_ratings in results:
+                events.append(chunk_events)
+                ratings.update(updated_ratings)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    order = pl.DataFrame({"tournament": replay.tournament_order(games_df)}).with_row_index("order")
+    if not events:
+        return replay.replay_ratings(games_df.clear(), ratings, gor_weight_column, model, batch_by)
+    events_df = pl.concat(events).join(order, on="tournament").sort(["order", "pin"]).drop("order")
+    return events_df, ratings
@@ -0,0 +1,78 @@
+from functools import lru_cache
+
+import numpy as np
+import src.gor_calculator as gc
+
+PREDICTION_CACHE_SIZE = 2**16
+# Gors are rounded to this precision before evaluation, so that cache keys for the same pairing match.
+GOR_QUANTUM = 0.001
+
+
+def _quantize(gor: np.ndarray) -> np.ndarray:
+    return np.round(gor / GOR_QUANTUM) * GOR_QUANTUM
+
+
+def _expected_result_arrays(gor: np.ndarray, opponent_gor: np.ndarray, handicap: np.ndarray, color: np.ndarray) -> np.ndarray:
+    beta = gc.beta_array(gc.adjusted_gor_array(gor, handicap, color == "b"))
+    opponent_beta = gc.beta_array(gc.adjusted_gor_array(opponent_gor, handicap, color == "w"))
+    return gc.expected_result_array(beta, opponent_beta)
+
+
+@lru_cache(maxsize=PREDICTION_CACHE_SIZE)
+def _cached_expected_result(gor_key: int, opponent_gor_key: int, handicap: float, color: str|None) -> float:
+    return float(_expected_result_arrays(
+        np.float64(gor_key * GOR_QUANTUM),
+        np.float64(opponent_gor_key * GOR_QUANTUM),
+        np.float64(handicap),
+        np.asarray(color, dtype=object),
+    ))
+
+
+def expected_result(gor: float, opponent_gor: float, handicap: float = 0, color: str|None = None) -> float:
+    """
+    Expected result of a single pairing, memoized on quantized inputs.
+
+    Same formula as `expected_result_expression` fed by `adjusted_gor_expression`, ie. the probability
+    of the first player winning. Color is the first player's color("b", "w" or None), the opponent
+    is assumed to have the other one. Missing gors give NaN, like the vectorized path.
+    """
+    if not (np.isfinite(gor) and np.isfinite(opponent_gor)):
+        return float(_expected_result_arrays(np.float64(gor), np.float64(opponent_gor), np.float64(handicap), np.asarray(color, dtype=object)))
+    return _cached_expected_result(
+        int(round(gor / GOR_QUANTUM)),
+        int(round(opponent_gor / GOR_QUANTUM)),
+        float(handicap),
+        color,
+    )
+
+
+def expected_results(gor, opponent_gor, handicap=0, color=None) -> np.ndarray:
+    """
+    Expected results for arrays of pairings, evaluated in one vectorized pass without building a DataFrame.
+
+    Arguments are broadcast against each other, so scalars can be mixed with arrays. Color is given
+    as "b", "w" or None for the first player. Gors are quantized the same way as in `expected_result`,
+    so both give identical values for the same pairing.
+    """
+    gor, opponent_gor, handicap, color = np.broadcast_arrays(
+        np.asarray(gor, dtype=np.float64),
+        np.asarray(opponent_gor, dtype=np.float64),
+        np.asarray(handicap, dtype=np.float64),
+        np.asarray(color, dtype=object),
+    )
+    return _expected_result_arrays(_quantize(gor), _quantize(opponent_gor), handicap, color)
+
+
+def expected_result_matrix(gors, handicap=0, color=None) -> np.ndarray:
+    """
+    All-pairs expected results, entry [i, j] is the probability of player i beating player j.
+
+    Handicap and color(of player i) can be given as scalars or as matrices matching the output,
+    by default all games are even.
+    """
+    gors = np.asarray(gors, dtype=np.float64)
+    return expected_results(gors[:, None], gors[None, :], handicap, color)
+
+
+def clear_prediction_cache() -> None:
+    _cached_expected_result.cache_clear()
@@ -0,0 +1,81 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+import src.gor_calculator as gc
+
+
+class RatingModel(ABC):
+    """
+    Rating system that can be run through `replay`, with columnar state and vectorized updates.
+
+    State is a dict of NumPy arrays indexed by dense player index, one array per name in `state_columns`.
+    The first state column is the rating itself, the one reported as igor/fgor by replays.
+
+    Games are passed as parallel arrays, one entry per game from one player's perspective:
+    - player, opponent: dense player indices
+    - handicap: handicap stones, NaN if unknown
+    - color_code: 1 for black, -1 for white, 0 for unknown
+    - score: 1.0 win, 0.0 loss, 0.5 jigo, NaN if unknown
+    - weight: tournament weight of the game
+    """
+    state_columns: tuple[str, ...] = ("rating",)
+
+    def initial_state(self, ratings: np.ndarray) -> dict[str, np.ndarray]:
+        """
+        State for players starting from the given ratings, eg. nominal gors of their ranks.
+        """
+        return {"rating": np.array(ratings, dtype=np.float64)}
+
+    @abstractmethod
+    def expected_score(self, state: dict[str, np.ndarray], player: np.ndarray, opponent: np.ndarray,
+                       handicap: np.ndarray, color_code: np.ndarray) -> np.ndarray:
+        """
+        Probability of the player winning each game.
+        """
+
+    @abstractmethod
+    def update(self, state: dict[str, np.ndarray], player: np.ndarray, opponent: np.ndarray, handicap: np.ndarray,
+               color_code: np.ndarray, score: np.ndarray, weight: np.ndarray) -> None:
+        """
+        Updates state in place from a batch of games played at the same time, a whole tournament or a round.
+
+        Games appear once from each side, so each update only needs to change the player's own state.
+        """
+
+
+class GorModel(RatingModel):
+    """
+    EGD gor, the reference model. Changes of a tournament are all computed from the ratings at its start.
+    """
+
+    def expected_score(self, state, player, opponent, handicap, color_code):
+        rating = state["rating"]
+        beta = gc.beta_array(gc.adjusted_gor_array(rating[player], handicap, color_code == 1))
+        opponent_beta = gc.beta_array(gc.adjusted_gor_array(rating[opponent], handicap, color_code == -1))
+        return gc.expected_result_array(beta, opponent_beta)
+
+    def update(self, state, player, opponent, handicap, color_code, score, weight):
+        rating = state["rating"]
+        change = gc.gor_change_array(rating[player], rating[opponent], handicap, color_code, score, weight)
+        # Unknown results don't change ratings.
+        known = ~np.isnan(change)
+        np.add.at(rating, player[known], change[known])
+
+
+class EloModel(RatingModel):
+    """
+    Plain Elo on the gor scale, ignoring handicap and color.
+    """
+
+    def __init__(self, k: float = 20.0, scale: float = 400.0):
+        self.k = k
+        self.scale = scale
+
+    def expected_score(self, state, player, opponent, handicap, color_code):
+        rating = state["rating"]
+        return 1 / (1 + np.power(10, (rating[opponent] - rating[player]) / self.scale))
+
+    def update(self, state, player, opponent, handicap, color_code, score, weight):
+        change = self.k * weight * (score - self.expected_score(state, player, opponent, handicap, color_code))
+        known = ~np.isnan(change)
+        np.add.at(state["rating"], player[known], change[known])
@@ -0,0 +1,151 @@
+import numpy as np
+import polars as pl
+import src.gor_calculator as gc
+import src.utils as utils
+from src.rating_models import GorModel, RatingModel
+
+
+def tournament_order(games_df: pl.DataFrame, tournament_column: str = "tournament") -> list[str]:
+    """
+    Tournament ids in chronological replay order, by date from the tournament id and then by id.
+    """
+    return (
+        games_df.select(pl.col(tournament_column).unique())
+        .with_columns(utils.tournament_date_from_id_expression(tournament_column).alias("date"))
+        .sort(["date", tournament_column])[tournament_column]
+        .to_list()
+    )
+
+
+def _spans(keys: np.ndarray) -> list[tuple[int, int]]:
+    """
+    Start and end of each run of equal values in a sorted key array.
+    """
+    boundaries = np.concatenate([[0], np.flatnonzero(keys[1:] != keys[:-1]) + 1, [len(keys)]])
+    return list(zip(boundaries[:-1].tolist(), boundaries[1:].tolist()))
+
+
+def _replay(
+        games_df: pl.DataFrame,
+        initial_ratings: dict[int, float|tuple]|None,
+        gor_weight_column: str,
+        model: RatingModel,
+        batch_by: str,
+) -> tuple[pl.DataFrame, np.ndarray, pl.DataFrame, dict[int, float|tuple]]:
+    if batch_by not in ("tournament", "round"):
+        raise ValueError(f"Unknown batch_by: {batch_by}")
+    ratings = dict(initial_ratings) if initial_ratings is not None else {}
+
+    # Games where either side has no pin, or the opponent has no entry of their own, can't be rated.
+    games_df = games_df.filter(pl.col("pin").is_not_null() & pl.col("opponent_pin").is_not_null())
+    games_df = games_df.join(
+        games_df.select("tournament", pl.col("pin").alias("opponent_pin")).unique(),
+        on=["tournament", "opponent_pin"],
+        how="semi",
+    )
+    tournaments = tournament_order(games_df)
+    order = pl.DataFrame({"tournament": tournaments}, schema={"tournament": games_df.schema["tournament"]}).with_row_index("order")
+    games_df = games_df.join(order, on="tournament").sort(
+        ["order", "round_number"] if batch_by == "round" else "order", maintain_order=True
+    )
+
+    pins, inverse = np.unique(np.concatenate([games_df["pin"].to_numpy(), games_df["opponent_pin"].to_numpy()]), return_inverse=True)
+    player, opponent = inverse[:games_df.height], inverse[games_df.height:]
+    columns = games_df.select(
+        pl.col("order").cast(pl.Int64),
+        pl.col("round_number").cast(pl.Int64) if batch_by == "round" else pl.lit(0, dtype=pl.Int64).alias("round_number"),
+        utils.rank_to_nominal_gor_expression("rank").cast(pl.Float64),
+        pl.col("handicap").cast(pl.Float64),
+        pl.when(pl.col("color") == "b").then(1).when(pl.col("color") == "w").then(-1).otherwise(0).cast(pl.Int8).alias("color_code"),
+        gc.result_score_expression("result").cast(pl.Float64),
+        pl.col(gor_weight_column).cast(pl.Float64),
+    )
+    tournament_index, round_number, nominal_gor, handicap, color_code, score, weight = (
+        columns[column].to_numpy() for column in columns.columns
+    )
+
+    # Players start from their known rating, or the nominal gor of their rank when first seen.
+    starting_rating = np.full(len(pins), np.nan)
+    has_rank = ~np.isnan(nominal_gor)
+    first_players, first_games = np.unique(player[has_rank], return_index=True)
+    starting_rating[first_players] = nominal_gor[has_rank][first_games]
+    known = [ratings.get(pin) for pin in pins.tolist()]
+    for i, value in enumerate(known):
+        if value is not None:
+            starting_rating[i] = value if np.isscalar(value) else value[0]
+    state = model.initial_state(starting_rating)
+    for i, value in enumerate(known):
+        if value is not None and not np.isscalar(value):
+            for column, column_value in zip(model.state_columns, value):
+                state[column][i] = column_value
+
+    rating_column = model.state_columns[0]
+    expected = np.full(games_df.height, np.nan)
+    events = []
+    for tournament_start, tournament_end in _spans(tournament_index):
+        participants = np.unique(player[tournament_start:tournament_end])
+        igor = state[rating_column][participants].copy()
+        tournament_batches = round_number[tournament_start:tournament_end]
+        for batch_start, batch_end in _spans(tournament_batches):
+            batch = slice(tournament_start + batch_start, tournament_start + batch_end)
+            expected[batch] = model.expected_score(state, player[batch], opponent[batch], handicap[batch], color_code[batch])
+            model.update(state, player[batch], opponent[batch], handicap[batch], color_code[batch], score[batch], weight[batch])
+        events.append(pl.DataFrame({
+            "tournament": [tournaments[tournament_index[tournament_start]]] * len(participants),
+            "pin": pins[participants],
+            "igor": igor,
+            "fgor": state[rating_column][participants],
+        }, schema={"tournament": pl.String, "pin": pl.Int64, "igor": pl.Float64, "fgor": pl.Float64}))
+
+    if len(model.state_columns) == 1:
+        ratings.update(zip(pins.tolist(), state[rating_column].tolist()))
+    else:
+        ratings.update(zip(pins.tolist(), zip(*(state[column].tolist() for column in model.state_columns))))
+
+    if events:
+        events_df = pl.concat(events)
+    else:
+        events_df = pl.DataFrame(schema={"tournament": pl.String, "pin": pl.Int64, "igor": pl.Float64, "fgor": pl.Float64})
+    return games_df.drop("order"), expected, events_df, ratings
+
+
+def replay_ratings(
+        games_df: pl.DataFrame,
+        initial_ratings: dict[int, float|tuple]|None = None,
+        gor_weight_column: str = "gor_weight",
+        model: RatingModel|None = None,
+        batch_by: str = "tournament",
+) -> tuple[pl.DataFrame, dict[int, float|tuple]]:
+    """
+    Replays tournaments in chronological order, carrying each player's final rating into their next tournament.
+
+    Games need columns tournament, pin, opponent_pin, rank, handicap, color, result and the gor weight column,
+    as produced by `parsing.tournament_as_df`, and round_number when batching by round. Games without a pin on
+    either side can't be attributed to a rating, and are skipped. Players start from the nominal gor of their
+    rank, unless they have a rating in `initial_ratings`.
+
+    Ratings are computed by `model`, EGD gor(`GorModel`) by default. Each tournament is one batch of updates,
+    or with batch_by="round", each round of it. For models with more than one state column, ratings map
+    pins to tuples of state values instead of single ratings.
+
+    Returns a DataFrame with columns tournament, pin, igor and fgor, sorted in replay order and by pin,
+    and the final ratings of every player.
+    """
+    _, _, events_df, ratings = _replay(games_df, initial_ratings, gor_weight_column, model or GorModel(), batch_by)
+    return events_df, ratings
+
+
+def replay_predictions(
+        games_df: pl.DataFrame,
+        initial_ratings: dict[int, float|tuple]|None = None,
+        gor_weight_column: str = "gor_weight",
+        model: RatingModel|None = None,
+        batch_by: str = "tournament",
+        expected_column: str = "expected_result",
+) -> pl.DataFrame:
+    """
+    Replays like `replay_ratings`, returning the rated games in replay order with the model's expected result
+    for each game, made before the batch the game is in. Can be passed to `evaluation.prediction_statistics`.
+    """
+    games_df, expected, _, _ = _replay(games_df, initial_ratings, gor_weight_column, model or GorModel(), batch_by)
+    return games_df.with_columns(pl.Series(expected_column, expected, dtype=pl.Float64, nan_to_null=True))
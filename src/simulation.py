@@ -0,0 +1,113 @@
+import numpy as np
+import polars as pl
+import src.gor_calculator as gc
+
+# McMahon scores start from the player's gor band(100 gor per rank), capped at the bar.
+MCMAHON_BAR = 2300
+
+
+def _initial_scores(gors: np.ndarray, pairing: str) -> np.ndarray:
+    if pairing == "swiss":
+        return np.zeros_like(gors)
+    if pairing == "mcmahon":
+        return np.floor(np.minimum(gors, MCMAHON_BAR) / 100)
+    raise ValueError(f"Unknown pairing system: {pairing}")
+
+
+def simulate_tournament(
+        true_gors: np.ndarray,
+        gors: np.ndarray,
+        rounds: int,
+        rng: np.random.Generator,
+        pairing: str = "mcmahon",
+        gor_weight: float = 1.0,
+) -> pl.DataFrame:
+    """
+    Simulates a tournament for many replicas at once, each row of the (replicas, players) arrays being one replica.
+
+    Every round, players are ordered by score and then by their current gor, and paired with their neighbour
+    in that order, Swiss or McMahon style. Repeat pairings aren't avoided. All games are even, with random
+    colors, and results are drawn from the expected result of the players' true gors. With an odd number of
+    players the last one in the order sits out the round.
+
+    Returns games from both players' perspectives, with columns replica, round_number, pin(player index
+    within the replica), opponent_pin, igor, igor_opponent, handicap, color, result and tournament_weight.
+    """
+    replicas, players = gors.shape
+    scores = _initial_scores(gors, pairing)
+    replica_index = np.arange(replicas)[:, None]
+    true_betas = gc.beta_array(true_gors)
+    # Scores are whole points, so score and gor combine into one sort key, which sorts much faster than lexsort.
+    gor_span = np.ptp(gors) + 1
+    games = []
+    for round_number in range(1, rounds + 1):
+        order = np.argsort(-(scores * gor_span + gors), axis=-1)
+        first = order[:, 0:players - 1:2]
+        second = order[:, 1:players:2]
+        swap = rng.random(first.shape) < 0.5
+        black = np.where(swap, second, first)
+        white = np.where(swap, first, second)
+        expected = gc.expected_result_array(true_betas[replica_index, black], true_betas[replica_index, white])
+        black_wins = rng.random(black.shape) < expected
+        scores[replica_index, black] += black_wins
+        scores[replica_index, white] += ~black_wins
+        games.append((round_number, black, white, black_wins))
+
+    replica = np.concatenate([np.broadcast_to(replica_index, black.shape).ravel() for _, black, _, _ in games])
+    round_numbers = np.concatenate([np.full(black.size, round_number, dtype=np.int8) for round_number, black, _, _ in games])
+    black = np.concatenate([black.ravel() for _, black, _, _ in games])
+    white = np.concatenate([white.ravel() for _, _, white, _ in games])
+    black_wins = np.concatenate([black_wins.ravel() for _, _, _, black_wins in games])
+    n_games = len(black)
+    # Strings are derived in Polars, building them from NumPy string arrays is far slower.
+    is_black = np.repeat(np.array([True, False]), n_games)
+    wins = np.concatenate([black_wins, ~black_wins])
+    return pl.DataFrame({
+        "replica": np.concatenate([replica, replica]),
+        "round_number": np.concatenate([round_numbers, round_numbers]),
+        "pin": np.concatenate([black, white]),
+        "opponent_pin": np.concatenate([white, black]),
+        "igor": np.concatenate([gors[replica, black], gors[replica, white]]),
+        "igor_opponent": np.concatenate([gors[replica, white], gors[replica, black]]),
+        "handicap": np.zeros(2 * n_games, dtype=np.int8),
+        "is_black": is_black,
+        "wins": wins,
+        "tournament_weight": np.full(2 * n_games, gor_weight),
+    }).with_columns(
+        pl.when(pl.col("is_black")).then(pl.lit("b")).otherwise(pl.lit("w")).alias("color"),
+        pl.when(pl.col("wins")).then(pl.lit("+")).otherwise(pl.lit("-")).alias("result"),
+    ).select("replica", "round_number", "pin", "opponent_pin", "igor", "igor_opponent", "handicap", "color", "result", "tournament_weight")
+
+
+def rating_error_convergence(
+        true_gors: np.ndarray,
+        initial_gors: np.ndarray,
+        tournaments: int,
+        rounds: int = 5,
+        pairing: str = "mcmahon",
+        seed: int|None = None,
+        gor_weight: float = 1.0,
+) -> pl.DataFrame:
+    """
+    Plays a series of simulated tournaments, rating each one with `calculate_gor_change`, and tracks
+    how far the ratings are from the true strengths.
+
+    `true_gors` and `initial_gors` are (replicas, players) arrays, or 1-d arrays of players to share one replica.
+    Each tournament draws from its own RNG stream spawned from `seed`, so results are reproducible.
+
+    Returns one row per tournament, with rmse and mean_error of the ratings after it, across all replicas.
+    """
+    true_gors = np.atleast_2d(np.asarray(true_gors, dtype=np.float64))
+    gors = np.array(np.broadcast_to(np.atleast_2d(np.asarray(initial_gors, dtype=np.float64)), true_gors.shape))
+    replicas, players = gors.shape
+    streams = [np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(tournaments)]
+
+    errors = []
+    for tournament, rng in enumerate(streams, start=1):
+        games = simulate_tournament(true_gors, gors, rounds, rng, pairing, gor_weight)
+        games = gc.calculate_gor_change(games)
+        flat_index = games["replica"].to_numpy().astype(np.int64) * players + games["pin"].to_numpy()
+        gors += np.bincount(flat_index, weights=games["gor_change"].to_numpy(), minlength=replicas * players).reshape(replicas, players)
+        error = gors - true_gors
+        errors.append((tournament, np.sqrt(np.mean(error ** 2)), np.mean(error)))
+    return pl.DataFrame(errors, schema=["tournament", "rmse", "mean_error"], orient="row")
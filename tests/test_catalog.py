@@ -0,0 +1,52 @@
+from datetime import date
+
+import polars as pl
+import src.catalog as catalog
+import src.parsing as parsing
+from tests.test_parsing import test_gotha
+
+second_gotha = """
+; CL[c]
+; PC[SE, Stockholm]
+; HA[h2]
+; KM[0.5]
+ 1 Voittaja Ykkonen         4d SE  Stock  2+/w0   3+/b0    |14011111
+ 2 Jaba Kakkonen            3d NO  Oslo   1-/b0   0=       |10222222
+ 3 Tyyppi Kolmonen          4d FI  Heh    0=      1-/w0    |10333333
+"""
+
+sources = [("T220222A", test_gotha), ("T190505B", second_gotha)]
+
+
+def test_build_catalog():
+    df = catalog.build_catalog(sources)
+    assert df.columns == list(catalog.catalog_schema)
+    assert df.rows() == [
+        ("T190505B", "C", 0.5, date(2019, 5, 5), "h2", "0.5", "SE, Stockholm", 3, 2, catalog.content_hash(second_gotha)),
+        ("T220222A", "A", 1.0, date(2022, 2, 22), "h9", "6.5", "FI, Helsinki", 5, 6, catalog.content_hash(test_gotha)),
+    ]
+
+
+def test_catalog_reuses_unchanged_rows():
+    previous = catalog.build_catalog(sources).with_columns(pl.lit(99, dtype=pl.Int32).alias("players"))
+    changed = [("T220222A", test_gotha), ("T190505B", second_gotha + "\n; CM[edited]")]
+    df = catalog.build_catalog(changed, previous)
+    assert df["tournament"].to_list() == ["T190505B", "T220222A"]
+    # Unchanged tournament comes from the previous catalog, changed one is scanned again.
+    assert df["players"].to_list() == [3, 99]
+
+
+def test_filter_catalog():
+    df = catalog.build_catalog(sources)
+    assert catalog.filter_catalog(df, classes=["A", "B"])["tournament"].to_list() == ["T220222A"]
+    assert catalog.filter_catalog(df, date_to=date(2020, 1, 1))["tournament"].to_list() == ["T190505B"]
+    assert catalog.filter_catalog(df, place="helsinki", handicap_policy="h9")["tournament"].to_list() == ["T220222A"]
+    assert catalog.filter_catalog(df, place="helsinki", handicap_policy="h2").is_empty()
+
+
+def test_catalog_rounds_ignore_ghost_columns():
+    # Extra token at the end of one line, which the parser cuts off along with the other ghost columns.
+    ghost_gotha = second_gotha.replace("0=       |10222222", "0=  x    |10222222")
+    df = catalog.build_catalog([("T190505B", ghost_gotha)])
+    assert df.select("players", "rounds").row(0) == (3, 2)
+    assert parsing.parse_gotha_games(ghost_gotha)["round_number"].n_unique() == 2
@@ -0,0 +1,82 @@
+import math
+
+import polars as pl
+import src.evaluation as evaluation
+import src.gor_calculator as gc
+
+games = {
+    "tournament": ["T100101A", "T100101A", "T100101A", "T110101A", "T110101A", "T120101A"],
+    "igor": [2100.0, 2000.0, 1500.0, 2100.0, 1600.0, 1650.0],
+    "igor_opponent": [2000.0, 2100.0, 1500.0, 1600.0, 2100.0, 1600.0],
+    "fgor": [2110.0, 1990.0, 1500.0, 2110.0, 1590.0, 1655.0],
+    "fgor_opponent": [1990.0, 2110.0, 1500.0, 1590.0, 2110.0, 1600.0],
+    "handicap": [0, 0, 0, 0, 0, 0],
+    "color": ["w", "b", "b", "w", "b", None],
+    "result": ["+", "-", "=", "-", "+", "?"],
+    "gor_weight": [1.0, 1.0, 1.0, 0.5, 0.5, 0.5],
+}
+
+
+def test_metrics_match_direct_calculation():
+    df = pl.DataFrame(games)
+    statistics = evaluation.prediction_statistics(df)
+    metrics = evaluation.prediction_metrics(statistics)
+
+    expected = df.with_columns(gc.game_expected_result_expression(), gc.result_score_expression()).filter(pl.col("score").is_not_null())
+    log_loss = -sum(
+        s * math.log(p) + (1 - s) * math.log(1 - p) for p, s in zip(expected["expected_result"], expected["score"])
+    ) / expected.height
+    brier = sum((p - s) ** 2 for p, s in zip(expected["expected_result"], expected["score"])) / expected.height
+
+    assert metrics["model"].to_list() == ["expected_result"]
+    assert metrics["games"].item() == 5
+    assert math.isclose(metrics["log_loss"].item(), log_loss)
+    assert math.isclose(metrics["brier_score"].item(), brier)
+
+
+def test_multiple_models_and_groups():
+    df = pl.DataFrame(games)
+    statistics = evaluation.prediction_statistics(
+        df,
+        predictions=[
+            gc.game_expected_result_expression("igor", "igor_opponent", output_column="igor"),
+            gc.game_expected_result_expression("fgor", "fgor_opponent", output_column="fgor"),
+        ],
+        group_by=[evaluation.rating_band_expression("igor", band_width=500), "gor_weight"],
+    )
+    metrics = evaluation.prediction_metrics(statistics, by=["rating_band", "gor_weight"])
+    assert metrics.select("model", "rating_band", "gor_weight", "games").rows() == [
+        ("fgor", 1500, 0.5, 1),
+        ("fgor", 1500, 1.0, 1),
+        ("fgor", 2000, 0.5, 1),
+        ("fgor", 2000, 1.0, 2),
+        ("igor", 1500, 0.5, 1),
+        ("igor", 1500, 1.0, 1),
+        ("igor", 2000, 0.5, 1),
+        ("igor", 2000, 1.0, 2),
+    ]
+    calibration = evaluation.calibration_curve(statistics)
+    assert calibration.filter(pl.col("model") == "igor")["games"].sum() == 5
+
+
+def test_streaming_matches_single_pass():
+    df = pl.DataFrame(games)
+    single = evaluation.prediction_metrics(evaluation.prediction_statistics(df))
+    streamed = evaluation.prediction_metrics(evaluation.stream_prediction_statistics(df.iter_slices(2)))
+    assert single["games"].to_list() == streamed["games"].to_list()
+    assert math.isclose(single["log_loss"].item(), streamed["log_loss"].item())
+
+
+def test_streaming_empty_input():
+    statistics = evaluation.stream_prediction_statistics([], group_by=["handicap"])
+    assert statistics.is_empty()
+    assert evaluation.prediction_metrics(statistics, by=["handicap"]).is_empty()
+    assert evaluation.calibration_curve(statistics).is_empty()
+
+
+def test_rolling_metrics():
+    df = pl.DataFrame(games)
+    statistics = evaluation.prediction_statistics(df, group_by=[evaluation.period_expression(every="1y")])
+    rolling = evaluation.rolling_prediction_metrics(statistics, window="2y")
+    assert rolling["period"].dt.year().to_list() == [2010, 2011]
+    assert rolling["games"].to_list() == [3, 5]
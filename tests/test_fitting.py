@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+import polars as pl
+import src.fitting as fitting
+
+
+def simulated_games(parameters: dict[str, float], size: int, seed: int = 1) -> pl.DataFrame:
+    rng = np.random.default_rng(seed)
+    gor = rng.uniform(100, 2300, size)
+    handicap = np.where(rng.random(size) < 0.4, rng.integers(1, 10, size), 0)
+    # Handicap games are roughly balanced, with the weaker player taking black.
+    gor_opponent = np.where(handicap > 0, gor + handicap * 100 + rng.normal(0, 150, size), gor + rng.normal(0, 200, size))
+    gor_opponent = np.clip(gor_opponent, 100, 2800)
+    color = np.where(handicap > 0, "b", np.where(rng.random(size) < 0.5, "b", "w"))
+    expected, _ = fitting.expected_result_gradient(
+        parameters, gor, gor_opponent, handicap.astype(float), (color == "b") & (handicap > 0), (color == "w") & (handicap > 0)
+    )
+    result = np.where(rng.random(size) < expected, "+", "-")
+    return pl.DataFrame({
+        "igor": gor,
+        "igor_opponent": gor_opponent,
+        "handicap": handicap,
+        "color": color,
+        "result": result,
+    })
+
+
+def test_gradient_matches_finite_differences():
+    df = simulated_games(fitting.egd_parameters, 50)
+    arrays = fitting._batch_arrays(df, "igor", "igor_opponent", "handicap", "color", "result")[:-1]
+    _, gradient = fitting.expected_result_gradient(fitting.egd_parameters, *arrays)
+
+    def logit(parameters):
+        expected, _ = fitting.expected_result_gradient(parameters, *arrays)
+        return np.log(expected / (1 - expected))
+
+    for name in fitting.egd_parameters:
+        step = 1e-4
+        plus = dict(fitting.egd_parameters, **{name: fitting.egd_parameters[name] + step})
+        minus = dict(fitting.egd_parameters, **{name: fitting.egd_parameters[name] - step})
+        numeric = (logit(plus) - logit(minus)) / (2 * step)
+        assert np.allclose(gradient[name], numeric, rtol=1e-4, atol=1e-8), name
+
+
+def test_fit_recovers_parameters():
+    true_parameters = {"beta_scale": 6.0, "beta_offset": 3300.0, "handicap_stone": 90.0, "handicap_offset": 30.0}
+    df = simulated_games(true_parameters, 100_000)
+    fitted = fitting.fit_expected_result_parameters(
+        df,
+        parameters=["beta_scale", "handicap_stone", "handicap_offset"],
+        batch_size=30_000,
+    )
+    assert fitted["parameter"].to_list() == ["beta_scale", "handicap_stone", "handicap_offset"]
+    for name, estimate, ci_lower, ci_upper in fitted.select("parameter", "estimate", "ci_lower", "ci_upper").rows():
+        assert ci_lower < estimate < ci_upper
+        assert abs(estimate - true_parameters[name]) < 4 * (ci_upper - ci_lower) / 2, name
+
+
+def test_fit_accepts_batch_iterables():
+    df = simulated_games(fitting.egd_parameters, 20_000)
+    from_frame = fitting.fit_expected_result_parameters(df, parameters=["beta_scale"], batch_size=5_000)
+    from_batches = fitting.fit_expected_result_parameters(lambda: df.iter_slices(7_000), parameters=["beta_scale"])
+    assert np.allclose(from_frame["estimate"], from_batches["estimate"])
+    assert np.allclose(from_frame["std_error"], from_batches["std_error"])
+
+
+def test_fit_reports_unidentifiable_parameters():
+    df = simulated_games(fitting.egd_parameters, 5_000).with_columns(pl.lit(0).alias("handicap"))
+    try:
+        fitting.fit_expected_result_parameters(df, parameters=["beta_scale", "handicap_stone", "handicap_offset"])
+    except ValueError as e:
+        assert "handicap_stone" in str(e) and "handicap_offset" in str(e)
+    else:
+        assert False, "Expected ValueError"
+
+
+def test_fit_reports_convergence():
+    df = simulated_games(fitting.egd_parameters, 5_000)
+    fitted = fitting.fit_expected_result_parameters(df)
+    assert fitted["converged"].all()
+    with pytest.warns(UserWarning):
+        fitted = fitting.fit_expected_result_parameters(df, parameters=["beta_scale", "handicap_stone"], max_iterations=1)
+    assert not fitted["converged"].any()
+    assert fitted["iterations"].to_list() == [1, 1]
+
+
+def test_fit_reports_boundary_estimates():
+    rng = np.random.default_rng(2)
+    gor = rng.uniform(100, 2800, 2_000)
+    gor_opponent = rng.uniform(100, 2800, 2_000)
+    # Higher gor always wins, so the likelihood grows until beta_offset reaches the highest gor.
+    df = pl.DataFrame({
+        "igor": gor,
+        "igor_opponent": gor_opponent,
+        "handicap": [0] * 2_000,
+        "color": ["w"] * 2_000,
+        "result": np.where(gor > gor_opponent, "+", "-"),
+    })
+    with pytest.warns(UserWarning, match="boundary"):
+        fitted = fitting.fit_expected_result_parameters(df, parameters=["beta_offset"])
+    assert not fitted["converged"].any()
+    assert fitted["estimate"].item() > max(gor.max(), gor_opponent.max())
+    assert fitted["std_error"].is_null().all() and fitted["ci_upper"].is_null().all()
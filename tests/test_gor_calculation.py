@@ -1,3 +1,4 @@
+import numpy as np
 import polars as pl
 import src.gor_calculator as gc
 
@@ -144,4 +145,35 @@ def test_jigo_calculation():
     ).with_columns(
         (pl.col("gor_change") - pl.col("gor_change_computed")).round(3).alias("Diff")
     )
-    assert diff_df["Diff"].abs().max() == 0.0 # type: ignore
\ No newline at end of file
+    assert diff_df["Diff"].abs().max() == 0.0 # type: ignore
+
+def test_kernel_matches_expressions(monkeypatch):
+    n = 300
+    rng = np.random.default_rng(0)
+    df = pl.DataFrame({
+        "gor": rng.uniform(-900, 2900, n),
+        "opponent_gor": rng.uniform(-900, 2900, n),
+        "handicap": rng.integers(0, 10, n),
+        "color": rng.choice(["b", "w", "x"], n),
+        "result": rng.choice(["+", "-", "=", "?"], n),
+        "tournament_weight": rng.choice([1.0, 0.75, 0.5, 0.25], n),
+    }).with_columns(
+        # Sprinkle in nulls to every column
+        *[pl.when(pl.int_range(0, n) % 17 == i).then(None).otherwise(pl.col(column)).alias(column)
+          for i, column in enumerate(["gor", "opponent_gor", "handicap", "color", "result", "tournament_weight"])],
+    )
+    arguments = dict(
+        gor_column="gor",
+        gor_opponent_column="opponent_gor",
+        handicap_column="handicap",
+        color_column="color",
+        result_column="result",
+        gor_weight_column="tournament_weight",
+    )
+    assert n < gc.KERNEL_THRESHOLD
+    kernel = gc.calculate_gor_change(df, **arguments)["gor_change"]
+    monkeypatch.setattr(gc, "KERNEL_THRESHOLD", 0)
+    expression = gc.calculate_gor_change(df, **arguments)["gor_change"]
+
+    assert kernel.is_null().to_list() == expression.is_null().to_list()
+    assert np.allclose(kernel.drop_nulls().to_numpy(), expression.drop_nulls().to_numpy(), rtol=1e-12, atol=1e-12, equal_nan=True)
@@ -0,0 +1,65 @@
+from datetime import date
+
+import numpy as np
+import polars as pl
+import pytest
+import src.head_to_head as head_to_head
+
+# Games from both perspectives, the second tournament has a handicap game.
+games = pl.DataFrame({
+    "tournament": ["T230101A"] * 4 + ["T230601A"] * 4,
+    "pin": [1, 2, 1, 2, 1, 3, 1, 2],
+    "opponent_pin": [2, 1, 2, 1, 3, 1, 2, 1],
+    "handicap": [0, 0, 0, 0, 2, 2, 0, 0],
+    "color": ["w", "b", "b", "w", "w", "b", "w", "b"],
+    "result": ["+", "-", "=", "=", "-", "+", "+", "-"],
+})
+
+
+def test_build_counts():
+    h2h = head_to_head.build_head_to_head(games)
+    assert h2h.pins.tolist() == [1, 2, 3]
+    assert h2h.indptr.tolist() == [0, 2, 3, 4]
+    row = h2h.row(1)
+    assert row["opponent_pin"].to_list() == [2, 3]
+    assert row["wins"].to_list() == [2, 0]
+    assert row["losses"].to_list() == [0, 1]
+    assert row["draws"].to_list() == [1, 0]
+    assert row["handicap_games"].to_list() == [0, 1]
+    assert row["handicap_stones"].to_list() == [0, -2]
+    opponent_row = h2h.row(3)
+    assert opponent_row["handicap_score"].to_list() == [1.0]
+    assert opponent_row["handicap_stones"].to_list() == [2]
+
+
+def test_time_window_and_append():
+    early = head_to_head.build_head_to_head(games, end=date(2023, 3, 1))
+    assert early.pins.tolist() == [1, 2]
+    assert early.row(1)["wins"].to_list() == [1]
+
+    appended = head_to_head.append_games(early, games, start=date(2023, 3, 1))
+    full = head_to_head.build_head_to_head(games)
+    # Existing players keep their ids.
+    assert appended.pins.tolist() == [1, 2, 3]
+    assert appended.player_ids([3, 1, 9]).tolist() == [2, 0, -1]
+    for field in ["indptr", "indices", *head_to_head.count_fields]:
+        assert np.array_equal(getattr(appended, field), getattr(full, field))
+
+
+def test_save_and_load(tmp_path):
+    h2h = head_to_head.build_head_to_head(games)
+    head_to_head.save_head_to_head(h2h, str(tmp_path))
+    loaded = head_to_head.load_head_to_head(str(tmp_path))
+    assert isinstance(loaded.wins, np.memmap)
+    assert loaded.row(2).equals(h2h.row(2))
+
+
+def test_empty_window():
+    h2h = head_to_head.build_head_to_head(games, start=date(2030, 1, 1))
+    assert len(h2h.pins) == 0 and h2h.indptr.tolist() == [0]
+    assert h2h.player_ids([1]).tolist() == [-1]
+    with pytest.raises(KeyError):
+        h2h.row(1)
+    # Appending to an empty matrix works like building from scratch.
+    appended = head_to_head.append_games(h2h, games)
+    assert appended.row(1).equals(head_to_head.build_head_to_head(games).row(1))
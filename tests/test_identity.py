@@ -0,0 +1,73 @@
+import polars as pl
+import src.identity as identity
+
+games = {
+    "tournament": ["T100101A", "T100101A", "T150101A", "T150101A", "T150101A", "T150101A"],
+    "pin": [11, 22, 11, 33, None, None],
+    "surname": ["Müller", "Virtanen", "Muller", "Smith", "Mueller", "Virtanen"],
+    "first_name": ["Hans", "Matti", "Hans", "John", "Hans", "Matti"],
+    "rank": ["3k", "1d", "2k", "5k", "2k", "2d"],
+    "opponent_surname": ["Virtanen", "Müller", "Smith", "Muller", "Virtanen", "Mueller"],
+    "opponent_first_name": ["Matti", "Hans", "John", "Hans", "Matti", "Hans"],
+    "opponent_rank": ["1d", "3k", "5k", "2k", "2d", "2k"],
+    "opponent_pin": [22, 11, 33, 11, None, None],
+}
+
+
+def test_normalize_name():
+    assert identity.normalize_name("Müller-Lüdenscheidt") == identity.normalize_name("muller ludenscheidt")
+    assert identity.normalize_name(None) is None
+
+
+def test_match_missing_pins():
+    assignments = identity.match_missing_pins(pl.DataFrame(games), min_confidence=0.7)
+    # Mueller is closest to pin 11, but Muller already has it in T150101A and plays a different opponent.
+    assert assignments.select("surname", "pin").rows() == [("Virtanen", 22)]
+    assert assignments["confidence"].is_between(0.7, 1.0).all()
+    # In a tournament without pin 11, Mueller gets it.
+    elsewhere = pl.DataFrame(games).with_columns(
+        pl.when(pl.col("pin").is_null()).then(pl.lit("T160101A")).otherwise(pl.col("tournament")).alias("tournament")
+    )
+    assignments = identity.match_missing_pins(elsewhere, min_confidence=0.7)
+    assert assignments.select("surname", "pin").rows() == [("Mueller", 11), ("Virtanen", 22)]
+    # Same entries with a rank far from the known one aren't confident matches.
+    far_rank = pl.DataFrame(games).with_columns(pl.when(pl.col("pin").is_null()).then(pl.lit("20k")).otherwise(pl.col("rank")).alias("rank"))
+    assert identity.match_missing_pins(far_rank, min_confidence=0.7).is_empty()
+
+
+def test_swapped_names_are_matched():
+    df = pl.DataFrame(games).with_columns(
+        pl.when(pl.col("pin").is_null()).then(pl.col("first_name")).otherwise(pl.col("surname")).alias("surname"),
+        pl.when(pl.col("pin").is_null()).then(pl.col("surname")).otherwise(pl.col("first_name")).alias("first_name"),
+    )
+    assignments = identity.match_missing_pins(df, min_confidence=0.7)
+    assert assignments.filter(pl.col("first_name") == "Virtanen")["pin"].to_list() == [22]
+
+
+def test_assignments_are_reused_and_applied():
+    df = pl.DataFrame(games)
+    previous = identity.match_missing_pins(df, min_confidence=0.7).with_columns(pl.lit(0.99).alias("confidence"))
+    updated = identity.update_pin_assignments(df, previous, min_confidence=0.7)
+    assert updated.equals(previous)
+
+    applied = identity.apply_pin_assignments(df, updated)
+    assert applied.columns == df.columns
+    assert applied["pin"].to_list() == [11, 22, 11, 33, None, 22]
+    assert applied["opponent_pin"].to_list() == [22, 11, 33, 11, 22, None]
+
+
+def test_pin_goes_to_one_entry_per_tournament():
+    df = pl.DataFrame({
+        "tournament": ["T100101A", "T100101A", "T150101A", "T150101A"],
+        "pin": [11, 22, None, None],
+        "surname": ["Müller", "Virtanen", "Muller", "Mueller"],
+        "first_name": ["Hans", "Matti", "Hans", "Hans"],
+        "rank": ["3k", "1d", "3k", "2k"],
+        "opponent_surname": ["Virtanen", "Müller", "Mueller", "Muller"],
+        "opponent_first_name": ["Matti", "Hans", "Hans", "Hans"],
+        "opponent_rank": ["1d", "3k", "2k", "3k"],
+        "opponent_pin": [22, 11, None, None],
+    })
+    assignments = identity.match_missing_pins(df, min_confidence=0.7)
+    # Both entries match pin 11, only the more confident one gets it.
+    assert assignments.select("surname", "rank", "pin").rows() == [("Muller", "3k", 11)]
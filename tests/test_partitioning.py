@@ -0,0 +1,49 @@
+import numpy as np
+import polars as pl
+import src.partitioning as partitioning
+import src.replay as replay
+
+
+def random_games(seed: int = 3) -> pl.DataFrame:
+    """
+    Round robin tournaments in two separate scenes, with a player crossing over from one to the other in 2021.
+    """
+    rng = np.random.default_rng(seed)
+    ranks = ["5d", "3d", "1d", "2k", "5k", "10k"]
+    frames = []
+    for year in range(19, 23):
+        for month, scene in [(3, range(100, 110)), (6, range(200, 210)), (9, range(100, 110)), (11, range(200, 210))]:
+            players = list(scene)
+            if year == 21 and scene.start == 200:
+                players.append(105)
+            tournament = f"T{year:02d}{month:02d}01A"
+            rows = []
+            for i, pin in enumerate(players):
+                for j, opponent in enumerate(players[i + 1:], start=i + 1):
+                    win = rng.random() < 0.5
+                    handicap = int(rng.integers(0, 3))
+                    rows.append((tournament, pin, opponent, ranks[pin % 6], handicap, "b", "+" if win else "-"))
+                    rows.append((tournament, opponent, pin, ranks[opponent % 6], handicap, "w", "-" if win else "+"))
+            frames.append(pl.DataFrame(rows, schema=["tournament", "pin", "opponent_pin", "rank", "handicap", "color", "result"], orient="row"))
+    return pl.concat(frames).with_columns(pl.lit(0.75).alias("gor_weight"))
+
+
+def test_player_components():
+    players, labels = partitioning.player_components(np.array([5, 1, 7, 9]), np.array([1, 3, 8, 7]))
+    assert players.tolist() == [1, 3, 5, 7, 8, 9]
+    assert labels.tolist() == [0, 0, 0, 3, 3, 3]
+
+
+def test_partition_games():
+    windows = partitioning.partition_games(random_games(), every="1y")
+    assert [len(components) for components in windows] == [2, 2, 1, 2]
+    assert windows[0][0]["pin"].min() == 100
+    assert windows[0][1]["pin"].min() == 200
+
+
+def test_parallel_replay_is_identical_to_serial():
+    games = random_games()
+    serial_events, serial_ratings = replay.replay_ratings(games)
+    parallel_events, parallel_ratings = partitioning.parallel_replay_ratings(games, every="1y", max_workers=2)
+    assert parallel_events.equals(serial_events)
+    assert parallel_ratings == serial_ratings
@@ -0,0 +1,69 @@
+import time
+
+import numpy as np
+import polars as pl
+import src.gor_calculator as gc
+import src.prediction as prediction
+
+pairings = {
+    "gor": [2705.84, 2705.84, 1800.0, 2100.0, 1500.0],
+    "opponent_gor": [2268.985, 2167.087, 2028.143, 2100.0, 1900.0],
+    "handicap": [4, 5, 0, 0, 3],
+    "color": ["w", "w", "b", None, "b"],
+}
+
+def expected_results_from_expressions(df: pl.DataFrame) -> np.ndarray:
+    return df.select(
+        gc.expected_result_expression(
+            beta_column=gc.beta_expression(
+                gc.adjusted_gor_expression("gor", "handicap", "color"), output_column="beta"
+            ),
+            opponent_beta_column=gc.beta_expression(
+                gc.adjusted_gor_expression("opponent_gor", "handicap", gc.swap_color_expression("color")), output_column="beta_opponent"
+            ),
+        )
+    )["expected_result"].to_numpy()
+
+
+def test_expected_results_match_expressions():
+    df = pl.DataFrame(pairings)
+    expected = expected_results_from_expressions(df)
+    small = prediction.expected_results(df["gor"], df["opponent_gor"], df["handicap"], np.array(pairings["color"], dtype=object))
+    assert np.allclose(small, expected, atol=1e-6)
+
+    single = [prediction.expected_result(*pairing) for pairing in zip(*pairings.values())]
+    assert np.allclose(single, small)
+
+    repeats = 100
+    large_df = pl.concat([df] * repeats)
+    large = prediction.expected_results(
+        large_df["gor"].to_numpy(),
+        large_df["opponent_gor"].to_numpy(),
+        large_df["handicap"].to_numpy(),
+        np.array(pairings["color"] * repeats, dtype=object),
+    )
+    assert np.allclose(large, np.tile(expected, repeats), atol=1e-6)
+
+
+def test_expected_result_is_cached():
+    prediction.clear_prediction_cache()
+    first = prediction.expected_result(2100.0, 2000.0, 1, "b")
+    second = prediction.expected_result(2100.0000001, 2000.0, 1, "b")
+    assert first == second
+    assert prediction._cached_expected_result.cache_info().hits == 1
+
+
+def test_expected_result_matrix():
+    gors = np.linspace(100, 2800, 500)
+    start = time.perf_counter()
+    matrix = prediction.expected_result_matrix(gors)
+    elapsed = time.perf_counter() - start
+    assert matrix.shape == (500, 500)
+    assert np.allclose(matrix + matrix.T, 1.0)
+    assert np.allclose(np.diag(matrix), 0.5)
+    assert elapsed < 1.0
+
+
+def test_missing_gor_gives_nan():
+    assert np.isnan(prediction.expected_result(float("nan"), 2000.0))
+    assert np.isnan(prediction.expected_results([2000.0, np.nan], [np.nan, 2000.0])).all()
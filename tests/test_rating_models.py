@@ -0,0 +1,50 @@
+import numpy as np
+import polars as pl
+import src.evaluation as evaluation
+import src.partitioning as partitioning
+import src.prediction as prediction
+import src.rating_models as rating_models
+import src.replay as replay
+from tests.test_partitioning import random_games
+from tests.test_replay import games
+
+
+def test_gor_model_expected_score_matches_formula():
+    model = rating_models.GorModel()
+    state = model.initial_state(np.array([2100.0, 1800.0, 1500.0]))
+    expected = model.expected_score(state, np.array([0, 1, 2]), np.array([1, 2, 0]), np.array([0.0, 3.0, 2.0]), np.array([1, 1, -1]))
+    assert np.allclose(expected, prediction.expected_results([2100.0, 1800.0, 1500.0], [1800.0, 1500.0, 2100.0], [0, 3, 2], np.array(["b", "b", "w"], dtype=object)))
+
+
+def test_elo_model_replays_in_parallel():
+    df = random_games()
+    model = rating_models.EloModel(k=24)
+    serial_events, serial_ratings = replay.replay_ratings(df, model=model)
+    parallel_events, parallel_ratings = partitioning.parallel_replay_ratings(df, model=model, max_workers=2)
+    assert parallel_events.equals(serial_events)
+    assert parallel_ratings == serial_ratings
+    gor_events, _ = replay.replay_ratings(df)
+    assert not gor_events["fgor"].equals(serial_events["fgor"])
+
+
+def test_round_batches():
+    df = pl.DataFrame(games)
+    tournament_events, _ = replay.replay_ratings(df, model=rating_models.EloModel())
+    round_events, _ = replay.replay_ratings(df, model=rating_models.EloModel(), batch_by="round")
+    first = pl.col("tournament") == "T230101A"
+    assert tournament_events.filter(first)["igor"].equals(round_events.filter(first)["igor"])
+    # Player 3 plays two rounds in the first tournament, second round sees the rating from the first.
+    player = (pl.col("tournament") == "T230101A") & (pl.col("pin") == 3)
+    assert tournament_events.filter(player)["fgor"].item() != round_events.filter(player)["fgor"].item()
+
+
+def test_replay_predictions_feed_evaluation():
+    df = random_games()
+    predictions = [
+        replay.replay_predictions(df, model=model, expected_column=name)
+        for name, model in [("gor", rating_models.GorModel()), ("elo", rating_models.EloModel())]
+    ]
+    combined = predictions[0].with_columns(predictions[1]["elo"])
+    metrics = evaluation.prediction_metrics(evaluation.prediction_statistics(combined, predictions=["gor", "elo"]))
+    assert metrics["model"].to_list() == ["elo", "gor"]
+    assert metrics["games"].to_list() == [combined.height, combined.height]
@@ -0,0 +1,43 @@
+import polars as pl
+import src.gor_calculator as gc
+import src.replay as replay
+
+# Two small tournaments, player 3 plays in both.
+games = {
+    "tournament": ["T230301A"] * 4 + ["T230101A"] * 4,
+    "pin": [1, 2, 3, 4, 3, 5, 3, 6],
+    "opponent_pin": [2, 1, 4, 3, 5, 3, 6, 3],
+    "rank": ["2d", "1k", "5k", "5k", "5k", "3k", "5k", "5k"],
+    "round_number": [1, 1, 1, 1, 1, 1, 2, 2],
+    "handicap": [0, 0, 0, 0, 0, 0, 0, 0],
+    "color": ["w", "b", "b", "w", "w", "b", "b", "w"],
+    "result": ["+", "-", "+", "-", "+", "-", "=", "="],
+    "gor_weight": [1.0] * 4 + [0.5] * 4,
+}
+
+
+def test_replay_order_and_carryover():
+    events, ratings = replay.replay_ratings(pl.DataFrame(games))
+    assert events["tournament"].to_list() == ["T230101A"] * 3 + ["T230301A"] * 4
+    assert events["pin"].to_list() == [3, 5, 6, 1, 2, 3, 4]
+
+    first = events.filter(pl.col("tournament") == "T230101A")
+    second = events.filter(pl.col("tournament") == "T230301A")
+    # Player 3 starts from nominal gor of 5k, and carries their final gor to the next tournament.
+    assert first.filter(pl.col("pin") == 3)["igor"].item() == 1600.0
+    assert second.filter(pl.col("pin") == 3)["igor"].item() == first.filter(pl.col("pin") == 3)["fgor"].item()
+    assert ratings[3] == second.filter(pl.col("pin") == 3)["fgor"].item()
+    assert second.filter(pl.col("pin") == 1)["fgor"].item() > 2200.0
+
+
+def test_replay_matches_gor_calculation():
+    df = pl.DataFrame(games).filter(pl.col("tournament") == "T230301A")
+    events, _ = replay.replay_ratings(df, initial_ratings={1: 2150.0})
+    player = events.filter(pl.col("pin") == 1)
+    assert player["igor"].item() == 2150.0
+    # Single win against 1k(2000 nominal gor) in an even game.
+    expected_change = gc.calculate_gor_change(
+        pl.DataFrame({"igor": [2150.0], "igor_opponent": [2000.0], "handicap": [0], "color": ["w"], "result": ["+"], "gor_weight": [1.0]}),
+        gor_weight_column="gor_weight",
+    )["gor_change"].item()
+    assert player["fgor"].item() == 2150.0 + expected_change
@@ -0,0 +1,35 @@
+import time
+
+import numpy as np
+import polars as pl
+import src.simulation as simulation
+
+
+def test_simulate_tournament_pairs_every_player_each_round():
+    rng = np.random.default_rng(0)
+    gors = np.tile(np.linspace(1000, 2400, 10), (3, 1))
+    games = simulation.simulate_tournament(gors, gors.copy(), rounds=4, rng=rng)
+    assert games.height == 3 * 4 * 10
+    per_round = games.group_by("replica", "round_number").agg(pl.col("pin").n_unique())
+    assert (per_round["pin"] == 10).all()
+    # Every game is listed from both sides with opposite results.
+    mirrored = games.join(games, left_on=["replica", "round_number", "pin"], right_on=["replica", "round_number", "opponent_pin"])
+    assert (mirrored["result"] != mirrored["result_right"]).all()
+    assert (mirrored["color"] != mirrored["color_right"]).all()
+
+
+def test_simulation_is_reproducible():
+    true_gors = np.linspace(500, 2500, 20)
+    first = simulation.rating_error_convergence(true_gors, 1500.0, tournaments=3, seed=7)
+    second = simulation.rating_error_convergence(true_gors, 1500.0, tournaments=3, seed=7)
+    assert first.equals(second)
+
+
+def test_rating_error_converges():
+    rng = np.random.default_rng(1)
+    true_gors = rng.uniform(500, 2500, (200, 40))
+    start = time.perf_counter()
+    errors = simulation.rating_error_convergence(true_gors, np.clip(true_gors + rng.normal(0, 300, true_gors.shape), 100, 2700), tournaments=10, pairing="swiss", seed=2)
+    assert time.perf_counter() - start < 30
+    assert errors["tournament"].to_list() == list(range(1, 11))
+    assert errors["rmse"][-1] < errors["rmse"][0]